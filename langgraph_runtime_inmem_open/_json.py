@@ -0,0 +1,50 @@
+"""
+JSON helpers shared by the disk-backed checkpoint saver and store
+
+orjson is used when it is installed and the standard library json module
+otherwise. Both paths read and write bytes.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+
+def dumps(obj: Any, *, indent: bool = False) -> bytes:
+    """
+    Serialize an object to JSON bytes.
+
+    Args:
+        obj: The object to serialize
+        indent: Whether to pretty-print with two-space indentation
+
+    Returns:
+        The UTF-8 encoded JSON document
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    # Encode to one string and return it whole; json.dump would issue a
+    # write per token through the file object. Non-ASCII text is written as
+    # UTF-8 rather than escaped, as orjson does.
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    """
+    Deserialize JSON bytes.
+
+    Raises:
+        ValueError: If the data is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
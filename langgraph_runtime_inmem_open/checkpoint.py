@@ -2,11 +2,61 @@
 Checkpoint implementations for the open-source langgraph-runtime-inmem alternative
 """
 
-import json
+import asyncio
+import atexit
+import os
+import pickle
+import queue
+import threading
 import time
+import weakref
 from abc import ABC, abstractmethod
 from contextlib import contextmanager
-from typing import Any, Dict, Optional
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from . import _json
+
+# Flags for the temporary file each write goes to before it is renamed over
+# the persistence file. O_BINARY only exists on Windows.
+_PERSIST_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+# Header of the binary persistence format; files without it are legacy JSON
+_FILE_MAGIC = b"LGSV\x02"
+# Fixed rather than HIGHEST_PROTOCOL so files stay readable on Python 3.8+
+_PICKLE_PROTOCOL = 5
+
+# Messages for the DiskBackedMemorySaver flusher thread besides changes,
+# which are queued as the saver itself; flush requests are threading.Event
+# objects that the thread sets once the write is done
+_STOP = object()
+
+# Savers whose pending changes are written at interpreter exit. Held weakly
+# so a saver that is never closed can still be collected.
+_OPEN_SAVERS: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def _close_open_savers() -> None:
+    """Close every disk-backed saver that is still open"""
+    errors = []
+    for saver in list(_OPEN_SAVERS):
+        try:
+            saver.close()
+        except Exception as exc:
+            errors.append(exc)
+    if errors:
+        raise errors[0]
+
+
+atexit.register(_close_open_savers)
+
+
+class CheckpointMetadata(NamedTuple):
+    """Fixed-shape metadata record kept for each checkpoint"""
+
+    timestamp: float
+    # Serialized size, filled in the first time it is requested
+    size: Optional[int] = None
 
 
 class BaseCheckpointSaver(ABC):
@@ -16,6 +66,9 @@ class BaseCheckpointSaver(ABC):
     This defines the interface that all checkpoint implementations must follow.
     """
 
+    # Subclasses stay weak-referenceable without a per-instance __dict__
+    __slots__ = ("__weakref__",)
+
     @abstractmethod
     def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
         """Get a checkpoint for a thread"""
@@ -37,10 +90,12 @@ class MemorySaver(BaseCheckpointSaver):
     Checkpoints are lost when the process exits.
     """
 
+    __slots__ = ("_checkpoints", "_metadata")
+
     def __init__(self):
         """Initialize the memory saver"""
         self._checkpoints = {}
-        self._metadata = {}  # Store metadata like timestamps
+        self._metadata: Dict[str, CheckpointMetadata] = {}
 
     def __enter__(self):
         """Enter context manager"""
@@ -70,10 +125,8 @@ class MemorySaver(BaseCheckpointSaver):
             checkpoint: The checkpoint data to save
         """
         self._checkpoints[thread_id] = checkpoint
-        self._metadata[thread_id] = {
-            "timestamp": time.time(),
-            "size": len(str(checkpoint)),
-        }
+        # The size is computed on demand in get_metadata
+        self._metadata[thread_id] = CheckpointMetadata(time.time())
 
     def delete(self, thread_id: str) -> None:
         """
@@ -104,7 +157,52 @@ class MemorySaver(BaseCheckpointSaver):
         Returns:
             Metadata dictionary or None if not found
         """
-        return self._metadata.get(thread_id)
+        entry = self._entry(thread_id)
+        if entry is None:
+            return None
+        metadata, checkpoint = entry
+        if metadata.size is None:
+            metadata = self._record_size(
+                thread_id, metadata, self._checkpoint_size(checkpoint)
+            )
+        return metadata._asdict()
+
+    def _entry(
+        self, thread_id: str
+    ) -> Optional[Tuple[CheckpointMetadata, Dict[str, Any]]]:
+        """Return a thread's metadata record and checkpoint, or None"""
+        # put stores the checkpoint before the record, so the checkpoint is
+        # at least as new as the record it is paired with
+        metadata = self._metadata.get(thread_id)
+        checkpoint = self._checkpoints.get(thread_id)
+        if metadata is None or checkpoint is None:
+            return None
+        return metadata, checkpoint
+
+    @staticmethod
+    def _dumps_checkpoint(checkpoint: Dict[str, Any]) -> bytes:
+        """Serialize a single checkpoint"""
+        return _json.dumps(checkpoint)
+
+    def _record_size(
+        self, thread_id: str, record: CheckpointMetadata, size: int
+    ) -> CheckpointMetadata:
+        """Store the size in a thread's metadata record and return the result"""
+        sized = record._replace(size=size)
+        # The record is replaced by every put, so it identifies the version
+        # of the checkpoint that was measured
+        if self._metadata.get(thread_id) is record:
+            self._metadata[thread_id] = sized
+        return sized
+
+    def _checkpoint_size(self, checkpoint: Dict[str, Any]) -> int:
+        """Return the serialized size of a checkpoint"""
+        try:
+            # Only the length is kept, so the encoding is not held in memory
+            return len(self._dumps_checkpoint(checkpoint))
+        except Exception:
+            # Not serializable; fall back to the repr
+            return len(repr(checkpoint))
 
     def clear_all(self) -> None:
         """Clear all checkpoints and metadata"""
@@ -125,55 +223,345 @@ class DiskBackedMemorySaver(MemorySaver):
     A disk-backed memory saver that persists checkpoints to disk.
 
     This extends the MemorySaver to provide persistence across process restarts.
+    Checkpoints are stored with pickle, so only load persistence files from a
+    trusted location. Files written as JSON by earlier versions are still read.
     """
 
-    def __init__(self, persist_path: Optional[str] = None):
+    __slots__ = (
+        "persist_path",
+        "flush_interval",
+        "max_pending",
+        "_changed",
+        "_written",
+        "_lock",
+        "_queue",
+        "_flusher",
+        "_flush_error",
+    )
+
+    def __init__(
+        self,
+        persist_path: Optional[str] = None,
+        flush_interval: float = 0.25,
+        max_pending: int = 128,
+    ):
         """
         Initialize the disk-backed memory saver.
 
+        Writes happen on a background thread: each change is queued and
+        the thread writes once ``max_pending`` changes have accumulated or
+        ``flush_interval`` seconds after the first of them. The queue holds
+        at most ``max_pending`` changes, after which writers block until
+        the thread catches up. Call ``flush()`` to wait for pending changes
+        to be written; this also happens on context exit and interpreter
+        exit.
+
+        Each write goes to a temporary file that is synced and then renamed
+        over the persistence file, so a crash leaves the previous contents
+        intact. Call ``close()`` to stop the background thread; a saver
+        that is dropped without it stops the thread once its pending
+        changes are written and it is garbage collected.
+
         Args:
             persist_path: Path to the persistence file
+            flush_interval: Maximum seconds a change waits to be written
+            max_pending: Maximum number of changes buffered before a write
         """
         super().__init__()
         self.persist_path = persist_path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # Threads changed since the last write
+        self._changed = set()
+        # Contents of the persistence file, owned by the flusher thread and
+        # updated one thread at a time; None until a full image exists
+        self._written: Optional[Dict[str, Dict[str, Any]]] = None
+        # Guards the checkpoint dicts against the flusher thread
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._flusher: Optional[threading.Thread] = None
+        self._flush_error: Optional[BaseException] = None
         if persist_path:
             self._load_from_disk()
+            # The thread only holds the saver weakly between writes and is
+            # stopped once the saver is collected
+            self._flusher = threading.Thread(
+                target=self._flush_loop,
+                args=(
+                    weakref.ref(self),
+                    self._queue,
+                    self.flush_interval,
+                    self.max_pending,
+                ),
+                name="checkpoint-flusher",
+                daemon=True,
+            )
+            self._flusher.start()
+            weakref.finalize(self, self._queue.put, _STOP)
+            _OPEN_SAVERS.add(self)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Exit context manager and write pending changes"""
+        self.flush()
 
     def _load_from_disk(self):
-        """Load checkpoints from disk if available"""
+        """
+        Load checkpoints from disk if available.
+
+        Raises:
+            ValueError: If the file is in the pickle format but cannot be
+                read; it is left in place rather than replaced by an empty
+                state
+        """
         try:
-            with open(self.persist_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self._checkpoints = data.get("checkpoints", {})
-                self._metadata = data.get("metadata", {})
-        except (FileNotFoundError, json.JSONDecodeError):
-            # File doesn't exist or is invalid, start with empty state
-            pass
+            raw = Path(self.persist_path).read_bytes()
+        except FileNotFoundError:
+            return
+        if raw.startswith(_FILE_MAGIC):
+            try:
+                data = pickle.loads(memoryview(raw)[len(_FILE_MAGIC) :])
+                checkpoints = {
+                    thread_id: pickle.loads(buf)
+                    for thread_id, buf in data["checkpoints"].items()
+                }
+            except Exception as exc:
+                raise ValueError(
+                    f"Cannot load checkpoints from {self.persist_path}"
+                ) from exc
+            self._written = data
+            sizes_match = True
+        else:
+            try:
+                data = _json.loads(raw)
+            except ValueError:
+                # Not a checkpoint file, start with empty state
+                return
+            checkpoints = data.get("checkpoints", {})
+            # Legacy sizes measured JSON, not the pickled form
+            sizes_match = False
+        self._checkpoints = checkpoints
+        metadata = data.get("metadata", {})
+        now = time.time()
+        for thread_id in checkpoints:
+            entry = metadata.get(thread_id, {})
+            self._metadata[thread_id] = CheckpointMetadata(
+                entry.get("timestamp", now),
+                entry.get("size") if sizes_match else None,
+            )
+
+    @staticmethod
+    def _dumps_checkpoint(checkpoint: Dict[str, Any]) -> bytes:
+        """Serialize a single checkpoint for the persistence file"""
+        return pickle.dumps(checkpoint, protocol=_PICKLE_PROTOCOL)
 
     def _save_to_disk(self):
-        """Save checkpoints to disk"""
-        if self.persist_path:
-            data = {
-                "checkpoints": self._checkpoints,
-                "metadata": self._metadata,
+        """
+        Save checkpoints to disk.
+
+        Only threads changed since the last write are encoded, and that
+        happens outside the lock so puts are not held up by it. The other
+        threads are written from the bytes kept from earlier writes.
+
+        Raises:
+            Exception: The first error from encoding a checkpoint, after the
+                other threads have been written
+        """
+        with self._lock:
+            if not self._changed:
+                return
+            changed = self._changed
+            self._changed = set()
+            written = self._written
+            if written is None:
+                # No image of the file yet, so every thread is written
+                written = {"checkpoints": {}, "metadata": {}}
+                changed = self._checkpoints.keys() | changed
+            # None marks a deleted thread
+            pending = {
+                thread_id: (
+                    (self._checkpoints[thread_id], self._metadata[thread_id])
+                    if thread_id in self._checkpoints
+                    else None
+                )
+                for thread_id in changed
             }
-            with open(self.persist_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+
+        encoded = {}
+        errors = []
+        for thread_id, entry in pending.items():
+            if entry is None:
+                written["checkpoints"].pop(thread_id, None)
+                written["metadata"].pop(thread_id, None)
+                continue
+            checkpoint, record = entry
+            try:
+                buf = self._dumps_checkpoint(checkpoint)
+            except Exception as exc:
+                # Keep the last good version of this thread on disk and
+                # still write the others
+                errors.append(exc)
+                continue
+            encoded[thread_id] = record
+            written["checkpoints"][thread_id] = buf
+            written["metadata"][thread_id] = {
+                "timestamp": record.timestamp,
+                "size": len(buf),
+            }
+        try:
+            self._overwrite(
+                _FILE_MAGIC + pickle.dumps(written, protocol=_PICKLE_PROTOCOL)
+            )
+        except BaseException:
+            # Retry these threads on the next write
+            with self._lock:
+                self._changed.update(pending)
+            raise
+        self._written = written
+
+        # Share the sizes with get_metadata; the bytes stay in _written
+        for thread_id, record in encoded.items():
+            self._record_size(thread_id, record, written["metadata"][thread_id]["size"])
+        if errors:
+            raise errors[0]
+
+    def _entry(
+        self, thread_id: str
+    ) -> Optional[Tuple[CheckpointMetadata, Dict[str, Any]]]:
+        """Read a thread's entry under the lock, as deletes may run concurrently"""
+        with self._lock:
+            return super()._entry(thread_id)
+
+    def _record_size(
+        self, thread_id: str, record: CheckpointMetadata, size: int
+    ) -> CheckpointMetadata:
+        """Store a size under the lock, as puts may run concurrently"""
+        with self._lock:
+            return super()._record_size(thread_id, record, size)
+
+    def _overwrite(self, data: bytes) -> None:
+        """Atomically replace the contents of the persistence file"""
+        tmp_path = f"{self.persist_path}.tmp"
+        fd = os.open(tmp_path, _PERSIST_FLAGS, 0o600)
+        try:
+            view = memoryview(data)
+            written = 0
+            while written < len(view):
+                written += os.write(fd, view[written:])
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, self.persist_path)
+
+    @staticmethod
+    def _flush_loop(
+        saver_ref: "weakref.ref[DiskBackedMemorySaver]",
+        flush_queue: "queue.Queue[Any]",
+        flush_interval: float,
+        max_pending: int,
+    ) -> None:
+        """Coalesce queued changes into disk writes until stopped"""
+        while True:
+            batch = [flush_queue.get()]
+            deadline = time.monotonic() + flush_interval
+            # Keep collecting changes until a flush or stop is requested
+            while (
+                isinstance(batch[-1], DiskBackedMemorySaver)
+                and len(batch) < max_pending
+            ):
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(flush_queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            saver = saver_ref()
+            if saver is not None:
+                # pylint: disable=protected-access
+                try:
+                    saver._save_to_disk()
+                except Exception as exc:
+                    # Reported to the next caller of flush()
+                    saver._flush_error = exc
+            stop = batch[-1] is _STOP
+            events = [item for item in batch if isinstance(item, threading.Event)]
+            # Drop the strong references before waiting for more work
+            batch = saver = None
+            for event in events:
+                event.set()
+            if stop:
+                return
+
+    def _mark_dirty(self) -> None:
+        """Record a change and hand it to the flusher thread"""
+        if self._flusher is not None:
+            # The queued reference keeps the saver alive until it is written
+            self._queue.put(self)
+
+    def flush(self) -> None:
+        """
+        Wait until pending changes are written to disk.
+
+        Raises:
+            Exception: The error raised by the most recent failed write
+        """
+        if self._flusher is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        error, self._flush_error = self._flush_error, None
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """Write pending changes and stop the background thread"""
+        # Changes made before this point are in _changed and go out with
+        # the final write; later ones are refused by _check_open
+        with self._lock:
+            flusher, self._flusher = self._flusher, None
+        if flusher is None:
+            return
+        _OPEN_SAVERS.discard(self)
+        self._queue.put(_STOP)
+        flusher.join()
+        # Release flush() calls that raced with close()
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if isinstance(item, threading.Event):
+                item.set()
+        error, self._flush_error = self._flush_error, None
+        if error is not None:
+            raise error
+
+    def _check_open(self) -> None:
+        """Raise if the saver persists to disk but has been closed"""
+        if self.persist_path and self._flusher is None:
+            raise ValueError("saver is closed")
 
     def put(self, thread_id: str, checkpoint: Dict[str, Any]) -> None:
-        """Save a checkpoint and persist to disk"""
-        super().put(thread_id, checkpoint)
-        self._save_to_disk()
+        """Save a checkpoint and schedule a disk write"""
+        with self._lock:
+            self._check_open()
+            super().put(thread_id, checkpoint)
+            self._changed.add(thread_id)
+        self._mark_dirty()
 
     def delete(self, thread_id: str) -> None:
-        """Delete a checkpoint and update disk"""
-        super().delete(thread_id)
-        self._save_to_disk()
+        """Delete a checkpoint and schedule a disk write"""
+        with self._lock:
+            self._check_open()
+            super().delete(thread_id)
+            self._changed.add(thread_id)
+        self._mark_dirty()
 
     def clear_all(self) -> None:
-        """Clear all checkpoints and update disk"""
-        super().clear_all()
-        self._save_to_disk()
+        """Clear all checkpoints and schedule a disk write"""
+        with self._lock:
+            self._check_open()
+            self._changed.update(self._checkpoints)
+            super().clear_all()
+        self._mark_dirty()
 
 
 class CheckpointContext:
@@ -183,6 +571,8 @@ class CheckpointContext:
     This provides a convenient way to work with checkpoints in a context.
     """
 
+    __slots__ = ("saver", "thread_id", "__weakref__")
+
     def __init__(self, saver: BaseCheckpointSaver, thread_id: str):
         """
         Initialize the checkpoint context.
@@ -237,6 +627,8 @@ class AsyncMemorySaver(MemorySaver):
     This provides async versions of the checkpoint operations.
     """
 
+    __slots__ = ()
+
     async def aget(self, thread_id: str) -> Optional[Dict[str, Any]]:
         """Async version of get"""
         return self.get(thread_id)
@@ -256,3 +648,37 @@ class AsyncMemorySaver(MemorySaver):
     async def aclear_all(self) -> None:
         """Async version of clear_all"""
         self.clear_all()
+
+
+class AsyncDiskBackedMemorySaver(AsyncMemorySaver, DiskBackedMemorySaver):
+    """
+    Async version of the disk-backed memory saver.
+
+    Operations that can wait on the flusher thread (a full write queue, a
+    flush or a close) run in the default executor so they never block the
+    event loop. Reads stay in memory and run inline.
+    """
+
+    __slots__ = ()
+
+    async def aput(self, thread_id: str, checkpoint: Dict[str, Any]) -> None:
+        """Async version of put"""
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.put, thread_id, checkpoint
+        )
+
+    async def adelete(self, thread_id: str) -> None:
+        """Async version of delete"""
+        await asyncio.get_running_loop().run_in_executor(None, self.delete, thread_id)
+
+    async def aclear_all(self) -> None:
+        """Async version of clear_all"""
+        await asyncio.get_running_loop().run_in_executor(None, self.clear_all)
+
+    async def aflush(self) -> None:
+        """Async version of flush"""
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    async def aclose(self) -> None:
+        """Async version of close"""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
@@ -2,10 +2,81 @@
 Store implementations for the open-source langgraph-runtime-inmem alternative
 """
 
-import json
+import builtins
+import functools
+import heapq
+import os
+import threading
 import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Tuple, Union
+from itertools import chain, islice
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from . import _json
+
+# Trie node key under which a node stores the namespace that ends there
+_NS_END = object()
+# Default for field lookups so a missing field never equals a filter value
+_MISSING = object()
+
+
+def _walk_trie(
+    node: Dict[Any, Any], depth: int, max_depth: Optional[int]
+) -> Iterator[Tuple[str, ...]]:
+    """Yield the namespaces stored in a trie subtree, at most max_depth long"""
+    for component, child in node.items():
+        if component is _NS_END:
+            yield child
+        elif max_depth is None or depth < max_depth:
+            yield from _walk_trie(child, depth + 1, max_depth)
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_filter(keys: Tuple[str, ...]) -> Callable[..., Callable[..., bool]]:
+    """
+    Generate a predicate factory specialized to one set of filter keys.
+
+    For keys ("type", "name") this returns the equivalent of
+    ``lambda _v0, _v1: lambda value: value.get("type", _MISSING) == _v0 and
+    value.get("name", _MISSING) == _v1``. The factory is cached per key set
+    and called with the filter values, so values need not be hashable.
+    """
+    params = ", ".join(f"_v{i}" for i in range(len(keys)))
+    checks = " and ".join(
+        f"value.get({str.__repr__(key)}, _MISSING) == _v{i}"
+        for i, key in enumerate(keys)
+    )
+    source = f"lambda {params}: lambda value: {checks}"
+    # str.__repr__ always yields a string literal, even for str subclasses
+    return eval(  # pylint: disable=eval-used
+        compile(source, "<store filter>", "eval"), {"_MISSING": _MISSING}
+    )
+
+
+def _make_predicate(
+    filter_dict: Optional[Dict[str, Any]],
+) -> Optional[Callable[[Dict[str, Any]], bool]]:
+    """Return a predicate matching the filter, or None when there is no filter"""
+    if not filter_dict:
+        return None
+    if all(isinstance(key, str) for key in filter_dict):
+        filter_items = sorted(filter_dict.items(), key=lambda item: item[0])
+        factory = _compile_filter(tuple(key for key, _ in filter_items))
+        return factory(*(expected for _, expected in filter_items))
+    return lambda value: all(
+        value.get(key, _MISSING) == expected for key, expected in filter_dict.items()
+    )
 
 
 class BaseStore(ABC):
@@ -15,6 +86,9 @@ class BaseStore(ABC):
     This defines the interface that all store implementations must follow.
     """
 
+    # Subclasses stay weak-referenceable without a per-instance __dict__
+    __slots__ = ("__weakref__",)
+
     @abstractmethod
     def get(
         self,
@@ -73,9 +147,24 @@ class InMemoryStore(BaseStore):
     In-memory dictionary-backed store with optional vector search.
 
     This is a simple in-memory implementation that stores data in Python dictionaries.
-    Data is lost when the process exits.
+    Data is lost when the process exits. Writes are serialized by a lock, while
+    search iterates items without holding it: a write that would resize a
+    namespace a reader is iterating replaces it with a copy instead.
     """
 
+    __slots__ = (
+        "_data",
+        "_namespaces",
+        "_ttl_data",
+        "_ttl_heap",
+        "_by_ns",
+        "_ns_trie",
+        "_by_suffix",
+        "_index_config",
+        "_lock",
+        "_readers",
+    )
+
     def __init__(self, **kwargs):
         """
         Initialize the in-memory store.
@@ -83,10 +172,26 @@ class InMemoryStore(BaseStore):
         Args:
             **kwargs: Additional configuration options (currently unused)
         """
-        self._data = {}
+        # Items keyed by (namespace, key)
+        self._data: Dict[Tuple[Tuple[str, ...], str], Dict[str, Any]] = {}
         self._namespaces = set()
-        self._ttl_data = {}  # Store TTL information
+        self._ttl_data = {}  # Current expiry time per (namespace, key)
+        # (expires_at, namespace, key) min-heap; entries whose time no longer
+        # matches _ttl_data were superseded and are skipped when popped
+        self._ttl_heap: List[Tuple[float, Tuple[str, ...], str]] = []
+        # Items grouped by namespace so search only visits matching namespaces
+        self._by_ns: Dict[Tuple[str, ...], Dict[str, Dict[str, Any]]] = {}
+        # Namespaces keyed component by component for prefix queries
+        self._ns_trie: Dict[Any, Any] = {}
+        # Namespaces by each of their suffixes, as insertion-ordered sets
+        self._by_suffix: Dict[Tuple[str, ...], Dict[Tuple[str, ...], None]] = {}
         self._index_config = kwargs.get("index", None)
+        # Serializes writers. Readers only hold it to pick up references and
+        # then iterate without it
+        self._lock = threading.RLock()
+        # Number of searches iterating each namespace's bucket; writers
+        # replace a bucket in use with a copy instead of resizing it in place
+        self._readers: Dict[Tuple[str, ...], int] = {}
 
     def get(
         self,
@@ -106,8 +211,10 @@ class InMemoryStore(BaseStore):
         Returns:
             The retrieved item or None if not found
         """
-        ns_key = self._make_key(namespace, key)
-        return self._data.get(ns_key)
+        if self._ttl_heap:
+            with self._lock:
+                self._expire_due(time.time())
+        return self._data.get((namespace, key))
 
     def put(
         self,
@@ -126,14 +233,26 @@ class InMemoryStore(BaseStore):
             key: Unique identifier within the namespace
             value: Dictionary containing the item's data
             index: Controls indexing (ignored in this implementation)
-            ttl: Time to live in minutes (ignored in this implementation)
+            ttl: Time to live in minutes; expired items are dropped on the
+                next get or search
         """
-        ns_key = self._make_key(namespace, key)
-        self._data[ns_key] = value
-        self._namespaces.add(namespace)
-
-        if ttl is not None:
-            self._ttl_data[ns_key] = time.time() + (ttl * 60)
+        ns_key = (namespace, key)
+        with self._lock:
+            self._data[ns_key] = value
+            bucket = self._by_ns.get(namespace)
+            if bucket is None:
+                self._by_ns[namespace] = {key: value}
+            elif key in bucket:
+                # Replacing a value keeps the size, so readers are unaffected
+                bucket[key] = value
+            else:
+                self._writable_bucket(namespace, bucket)[key] = value
+            self._add_namespace(namespace)
+
+            if ttl is None:
+                self._ttl_data.pop(ns_key, None)
+            else:
+                self._set_expiry(namespace, key, time.time() + (ttl * 60))
 
     def delete(self, namespace: Tuple[str, ...], key: str) -> None:
         """
@@ -143,9 +262,8 @@ class InMemoryStore(BaseStore):
             namespace: Hierarchical path for the item
             key: Unique identifier within the namespace
         """
-        ns_key = self._make_key(namespace, key)
-        self._data.pop(ns_key, None)
-        self._ttl_data.pop(ns_key, None)
+        with self._lock:
+            self._remove(namespace, key)
 
     def search(
         self,
@@ -172,17 +290,24 @@ class InMemoryStore(BaseStore):
         Returns:
             List of matching items
         """
-        results = []
-        prefix_str = self._make_key(namespace_prefix, "")
-
-        for ns_key, value in self._data.items():
-            if ns_key.startswith(prefix_str):
-                if filter is None or self._matches_filter(value, filter):
-                    results.append(value)
-
-        # Apply offset and limit
-        results = results[offset : offset + limit]
-        return results
+        with self._lock:
+            if self._ttl_heap:
+                self._expire_due(time.time())
+            namespaces = list(self._namespaces_under(namespace_prefix, None))
+        predicate = _make_predicate(filter)
+        buckets = self._read_buckets(namespaces)
+        matches: Iterator[Dict[str, Any]] = chain.from_iterable(buckets)
+        if predicate is not None:
+            matches = builtins.filter(predicate, matches)
+
+        # Stop as soon as offset + limit matches have been seen; islice
+        # rejects negative bounds, so clamp them to zero
+        offset, limit = max(offset, 0), max(limit, 0)
+        try:
+            return list(islice(matches, offset, offset + limit))
+        finally:
+            # Release the bucket the search stopped in
+            buckets.close()
 
     def list_namespaces(
         self,
@@ -206,34 +331,110 @@ class InMemoryStore(BaseStore):
         Returns:
             List of namespace tuples
         """
-        namespaces = list(self._namespaces)
-
-        # Apply filters
-        if prefix is not None:
-            namespaces = [ns for ns in namespaces if ns[: len(prefix)] == prefix]
-
-        if suffix is not None:
-            namespaces = [ns for ns in namespaces if ns[-len(suffix) :] == suffix]
-
-        if max_depth is not None:
-            namespaces = [ns for ns in namespaces if len(ns) <= max_depth]
-
-        # Apply offset and limit
-        namespaces = namespaces[offset : offset + limit]
-        return namespaces
-
-    def _make_key(self, namespace: Tuple[str, ...], key: str) -> str:
-        """Create a key from namespace and key"""
-        return f"{':'.join(namespace)}:{key}"
+        # The namespace indexes are updated in place, so walk them under the
+        # lock; the walk stops after offset + limit namespaces
+        with self._lock:
+            if suffix:
+                # Every namespace ending with the suffix, narrowed to the prefix
+                namespaces = iter(self._by_suffix.get(tuple(suffix), ()))
+                if max_depth is not None:
+                    namespaces = (ns for ns in namespaces if len(ns) <= max_depth)
+                if prefix:
+                    prefix_len = len(prefix)
+                    namespaces = (ns for ns in namespaces if ns[:prefix_len] == prefix)
+            else:
+                namespaces = self._namespaces_under(prefix or (), max_depth)
+
+            # Apply offset and limit without materializing skipped namespaces
+            offset, limit = max(offset, 0), max(limit, 0)
+            return list(islice(namespaces, offset, offset + limit))
+
+    def _read_buckets(
+        self, namespaces: List[Tuple[str, ...]]
+    ) -> Iterator[Iterable[Dict[str, Any]]]:
+        """Yield the values of each namespace's bucket for lock-free iteration"""
+        readers = self._readers
+        for namespace in namespaces:
+            with self._lock:
+                bucket = self._by_ns.get(namespace)
+                if not bucket:
+                    continue
+                readers[namespace] = readers.get(namespace, 0) + 1
+            try:
+                yield bucket.values()
+            finally:
+                with self._lock:
+                    if readers[namespace] == 1:
+                        del readers[namespace]
+                    else:
+                        readers[namespace] -= 1
+
+    def _writable_bucket(
+        self, namespace: Tuple[str, ...], bucket: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Return a bucket that may be resized, copying it if readers hold it"""
+        if namespace in self._readers:
+            bucket = self._by_ns[namespace] = dict(bucket)
+        return bucket
+
+    def _remove(self, namespace: Tuple[str, ...], key: str) -> None:
+        """Drop an item from every index"""
+        ns_key = (namespace, key)
+        self._data.pop(ns_key, None)
+        self._ttl_data.pop(ns_key, None)
+        bucket = self._by_ns.get(namespace)
+        if bucket is not None and key in bucket:
+            del self._writable_bucket(namespace, bucket)[key]
 
-    def _matches_filter(
-        self, value: Dict[str, Any], filter_dict: Dict[str, Any]
-    ) -> bool:
-        """Check if a value matches the filter criteria"""
-        for filter_key, filter_value in filter_dict.items():
-            if filter_key not in value or value[filter_key] != filter_value:
-                return False
-        return True
+    def _set_expiry(
+        self, namespace: Tuple[str, ...], key: str, expires_at: float
+    ) -> None:
+        """Record when an item expires"""
+        ttl_data = self._ttl_data
+        ttl_data[(namespace, key)] = expires_at
+        heap = self._ttl_heap
+        heapq.heappush(heap, (expires_at, namespace, key))
+        # Superseded entries only leave the heap once due, so rebuild it from
+        # the current expiry times before they pile up
+        if len(heap) > 2 * len(ttl_data):
+            heap[:] = [
+                (expires, item_ns, item_key)
+                for (item_ns, item_key), expires in ttl_data.items()
+            ]
+            heapq.heapify(heap)
+
+    def _expire_due(self, now: float) -> None:
+        """Drop every item whose expiry time is at or before now"""
+        heap = self._ttl_heap
+        while heap and heap[0][0] <= now:
+            expires_at, namespace, key = heapq.heappop(heap)
+            if self._ttl_data.get((namespace, key)) == expires_at:
+                self._remove(namespace, key)
+
+    def _add_namespace(self, namespace: Tuple[str, ...]) -> None:
+        """Register a namespace in the namespace set, trie and suffix index"""
+        if namespace in self._namespaces:
+            return
+        self._namespaces.add(namespace)
+        node = self._ns_trie
+        for component in namespace:
+            node = node.setdefault(component, {})
+        node[_NS_END] = namespace
+        for start in range(len(namespace)):
+            self._by_suffix.setdefault(namespace[start:], {})[namespace] = None
+
+    def _namespaces_under(
+        self, prefix: Tuple[str, ...], max_depth: Optional[int]
+    ) -> Iterator[Tuple[str, ...]]:
+        """Yield the namespaces that start with prefix, at most max_depth long"""
+        if max_depth is not None and len(prefix) > max_depth:
+            return iter(())
+        node = self._ns_trie
+        for component in prefix:
+            node = node.get(component)
+            if node is None:
+                return iter(())
+        return _walk_trie(node, len(prefix), max_depth)
 
 
 class DiskBackedInMemStore(InMemoryStore):
@@ -241,43 +442,208 @@ class DiskBackedInMemStore(InMemoryStore):
     Disk-backed in-memory store with persistence.
 
     This extends InMemoryStore to provide disk persistence across process restarts.
+    Each put or delete is appended as one JSON record to a write-ahead log next
+    to the snapshot file (``persist_path + ".log"``). Once the log holds
+    ``compact_threshold`` records it is folded into a fresh snapshot and
+    truncated.
     """
 
-    def __init__(self, persist_path: Optional[str] = None, **kwargs):
+    __slots__ = (
+        "persist_path",
+        "compact_threshold",
+        "pretty",
+        "_log",
+        "_log_records",
+    )
+
+    def __init__(
+        self,
+        persist_path: Optional[str] = None,
+        compact_threshold: int = 1000,
+        pretty: bool = False,
+        **kwargs,
+    ):
         """
         Initialize the disk-backed store.
 
         Args:
             persist_path: Path to the persistence file
+            compact_threshold: Number of log records that triggers compaction
+            pretty: Whether to indent the snapshot file for readability
             **kwargs: Additional configuration options
         """
         super().__init__(**kwargs)
         self.persist_path = persist_path
+        self.compact_threshold = compact_threshold
+        self.pretty = pretty
+        self._log = None
+        self._log_records = 0
         if persist_path:
             self._load_from_disk()
+            # Kept open for the lifetime of the store; closed by close()
+            self._log = open(  # pylint: disable=consider-using-with
+                self._log_path, "ab"
+            )
+
+    @property
+    def _log_path(self) -> str:
+        """Path to the write-ahead log"""
+        return f"{self.persist_path}.log"
+
+    def _read_snapshot(self) -> Dict[str, Any]:
+        """
+        Read the snapshot file, or return an empty one if it does not exist.
+
+        Raises:
+            ValueError: If the snapshot exists but cannot be read; it is left
+                in place rather than replaced by an empty state
+        """
+        try:
+            raw = Path(self.persist_path).read_bytes()
+        except FileNotFoundError:
+            return {}
+        try:
+            return _json.loads(raw)
+        except ValueError as exc:
+            raise ValueError(
+                f"Cannot load store snapshot from {self.persist_path}"
+            ) from exc
 
     def _load_from_disk(self):
-        """Load data from disk if available"""
+        """Load the snapshot and replay the write-ahead log if available"""
+        data = self._read_snapshot()
+        if "items" in data:
+            for namespace, key, value, expires_at in data["items"]:
+                self._restore(tuple(namespace), key, value, expires_at)
+        else:
+            self._load_legacy_snapshot(data)
+        for namespace in data.get("namespaces", []):
+            self._add_namespace(tuple(namespace))
+
         try:
-            with open(self.persist_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self._data = data.get("data", {})
-                self._namespaces = set(data.get("namespaces", []))
-                self._ttl_data = data.get("ttl_data", {})
-        except (FileNotFoundError, json.JSONDecodeError):
-            # File doesn't exist or is invalid, start with empty state
-            pass
+            log = Path(self._log_path).read_bytes()
+        except FileNotFoundError:
+            return
+        end = 0  # Offset just past the last complete record
+        for line in log.splitlines(keepends=True):
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("unterminated record")
+                record = _json.loads(line)
+            except ValueError:
+                # Torn write at the end of the log
+                break
+            namespace = tuple(record["ns"])
+            if record["op"] == "put":
+                self._restore(
+                    namespace, record["key"], record["value"], record.get("expires_at")
+                )
+            else:
+                super().delete(namespace, record["key"])
+            self._log_records += 1
+            end += len(line)
+        if end < len(log):
+            # Drop the torn tail so new records do not follow it
+            os.truncate(self._log_path, end)
+
+    def _load_legacy_snapshot(self, data: Dict[str, Any]) -> None:
+        """Load a snapshot that stores items under joined "ns:key" strings"""
+        # Match the longest namespace first so nested namespaces win
+        namespaces = sorted(
+            map(tuple, data.get("namespaces", [])), key=len, reverse=True
+        )
+        ttl_data = data.get("ttl_data", {})
+        for ns_key, value in data.get("data", {}).items():
+            for namespace in namespaces:
+                prefix = ":".join(namespace) + ":"
+                if ns_key.startswith(prefix):
+                    key = ns_key[len(prefix) :]
+                    self._restore(namespace, key, value, ttl_data.get(ns_key))
+                    break
+
+    def _restore(
+        self,
+        namespace: Tuple[str, ...],
+        key: str,
+        value: Dict[str, Any],
+        expires_at: Optional[float],
+    ) -> None:
+        """Insert a persisted item without logging it"""
+        super().put(namespace, key, value)
+        if expires_at is not None:
+            self._set_expiry(namespace, key, expires_at)
 
     def _save_to_disk(self):
-        """Save data to disk"""
+        """Write a full snapshot to disk"""
         if self.persist_path:
+            items = [
+                [
+                    namespace,
+                    key,
+                    value,
+                    self._ttl_data.get((namespace, key)),
+                ]
+                for namespace, bucket in self._by_ns.items()
+                for key, value in bucket.items()
+            ]
             data = {
-                "data": self._data,
+                "items": items,
                 "namespaces": list(self._namespaces),
-                "ttl_data": self._ttl_data,
             }
-            with open(self.persist_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_json.dumps(data, indent=self.pretty))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.persist_path)
+            # Make the rename durable before compact() truncates the log;
+            # directories cannot be opened this way on Windows
+            if hasattr(os, "O_DIRECTORY"):
+                dir_fd = os.open(
+                    os.path.dirname(os.path.abspath(self.persist_path)),
+                    os.O_RDONLY | os.O_DIRECTORY,
+                )
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+
+    def _append_log(self, record: Dict[str, Any]) -> None:
+        """Append a record to the write-ahead log, compacting when it grows"""
+        if self._log is None:
+            return
+        self._log.write(_json.dumps(record) + b"\n")
+        self._log.flush()
+        self._log_records += 1
+        if self._log_records >= self.compact_threshold:
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Fold the write-ahead log into a new snapshot and truncate it.
+
+        Raises:
+            ValueError: If the store has been closed
+        """
+        if not self.persist_path:
+            return
+        with self._lock:
+            self._check_open()
+            self._save_to_disk()
+            self._log.truncate(0)
+            self._log_records = 0
+
+    def close(self) -> None:
+        """Close the write-ahead log; later writes raise ValueError"""
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def _check_open(self) -> None:
+        """Raise if the store persists to disk but has been closed"""
+        if self.persist_path and self._log is None:
+            raise ValueError("store is closed")
 
     def put(
         self,
@@ -288,14 +654,27 @@ class DiskBackedInMemStore(InMemoryStore):
         *,
         ttl: Optional[float] = None,
     ) -> None:
-        """Store an item and persist to disk"""
-        super().put(namespace, key, value, index, ttl=ttl)
-        self._save_to_disk()
+        """Store an item and append it to the log"""
+        # Log under the lock so records land in the order they were applied
+        with self._lock:
+            self._check_open()
+            super().put(namespace, key, value, index, ttl=ttl)
+            self._append_log(
+                {
+                    "op": "put",
+                    "ns": namespace,
+                    "key": key,
+                    "value": value,
+                    "expires_at": self._ttl_data.get((namespace, key)),
+                }
+            )
 
     def delete(self, namespace: Tuple[str, ...], key: str) -> None:
-        """Delete an item and update disk"""
-        super().delete(namespace, key)
-        self._save_to_disk()
+        """Delete an item and append the deletion to the log"""
+        with self._lock:
+            self._check_open()
+            super().delete(namespace, key)
+            self._append_log({"op": "del", "ns": namespace, "key": key})
 
 
 def Store(*args, **kwargs):
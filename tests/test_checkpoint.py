@@ -2,12 +2,19 @@
 Tests for the checkpoint module
 """
 
+import gc
+import threading
+import weakref
+from contextlib import closing
+
 import pytest
 
 from langgraph_runtime_inmem_open.checkpoint import (
+    AsyncDiskBackedMemorySaver,
     AsyncMemorySaver,
     BaseCheckpointSaver,
     CheckpointContext,
+    CheckpointMetadata,
     DiskBackedMemorySaver,
     MemorySaver,
 )
@@ -46,6 +53,66 @@ class TestMemorySaverOperations:
         assert hasattr(self.saver, "_checkpoints")  # pylint: disable=protected-access
         assert hasattr(self.saver, "_metadata")  # pylint: disable=protected-access
 
+    def test_metadata_size_is_computed_on_demand(self, monkeypatch):
+        """Test that put defers serialization until the size is requested"""
+        encoded = []
+        dumps = MemorySaver._dumps_checkpoint
+
+        def counting_dumps(checkpoint):
+            encoded.append(checkpoint)
+            return dumps(checkpoint)
+
+        monkeypatch.setattr(
+            MemorySaver, "_dumps_checkpoint", staticmethod(counting_dumps)
+        )
+        self.saver.put("thread-1", {"step": 1})
+        assert not encoded
+
+        size = self.saver.get_metadata("thread-1")["size"]
+        assert size == len(dumps({"step": 1}))
+        assert self.saver.get_metadata("thread-1")["size"] == size
+        assert len(encoded) == 1
+
+        self.saver.put("thread-1", {"step": 2, "extra": "data"})
+        assert self.saver.get_metadata("thread-1")["size"] > size
+        assert len(encoded) == 2
+
+    def test_metadata_record(self):
+        """Test that metadata is kept as a record and the size is remembered"""
+        records = self.saver._metadata  # pylint: disable=protected-access
+        self.saver.put("thread-1", {"step": 1})
+        assert isinstance(records["thread-1"], CheckpointMetadata)
+        assert records["thread-1"].size is None
+
+        metadata = self.saver.get_metadata("thread-1")
+        assert set(metadata) == {"timestamp", "size"}
+        assert records["thread-1"].size == metadata["size"]
+
+    def test_put_non_serializable_checkpoint(self):
+        """Test that checkpoints that are not JSON-serializable are still kept"""
+        checkpoint = {"value": object()}
+        self.saver.put("thread-1", checkpoint)
+        assert self.saver.get("thread-1") is checkpoint
+        assert self.saver.get_metadata("thread-1")["size"] > 0
+
+    def test_metadata_survives_concurrent_delete(self, monkeypatch):
+        """Test that a delete while the size is computed does not raise"""
+
+        def deleting_dumps(checkpoint):
+            self.saver.delete("thread-1")
+            raise TypeError("not serializable")
+
+        monkeypatch.setattr(
+            MemorySaver, "_dumps_checkpoint", staticmethod(deleting_dumps)
+        )
+        self.saver.put("thread-1", {"step": 1})
+        metadata = self.saver.get_metadata("thread-1")
+        assert metadata["size"] == len(repr({"step": 1}))
+        assert self.saver.get_metadata("thread-1") is None
+        assert (
+            "thread-1" not in self.saver._metadata
+        )  # pylint: disable=protected-access
+
     def test_context_manager(self):
         """Test the memory saver as a context manager"""
         with self.saver as saver:
@@ -53,6 +120,253 @@ class TestMemorySaverOperations:
             assert saver is not None
 
 
+class TestDiskBackedMemorySaver:
+    """Test the disk-backed memory saver"""
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test that checkpoints are reloaded from disk"""
+        path = str(tmp_path / "checkpoints.json")
+        saver = DiskBackedMemorySaver(persist_path=path)
+        saver.put("thread-1", {"step": 1, "data": {"key": "value"}})
+        saver.flush()
+
+        reloaded = DiskBackedMemorySaver(persist_path=path)
+        assert reloaded.get("thread-1") == {"step": 1, "data": {"key": "value"}}
+        assert reloaded.get_metadata("thread-1") is not None
+        saver.close()
+        reloaded.close()
+
+    def test_replaces_file(self, tmp_path):
+        """Test that a smaller state shrinks the file after a larger one"""
+        path = tmp_path / "checkpoints.json"
+        saver = DiskBackedMemorySaver(persist_path=str(path))
+        saver.put("thread-1", {"data": "x" * 1000})
+        saver.flush()
+        large_size = path.stat().st_size
+
+        saver.put("thread-1", {"data": "x"})
+        saver.close()
+        assert path.stat().st_size < large_size
+
+        reloaded = DiskBackedMemorySaver(persist_path=str(path))
+        assert reloaded.get("thread-1") == {"data": "x"}
+        reloaded.close()
+
+    def test_batches_writes(self, tmp_path):
+        """Test that writes are deferred until the interval passes or a flush"""
+        path = tmp_path / "checkpoints.json"
+        saver = DiskBackedMemorySaver(persist_path=str(path), flush_interval=60)
+
+        saver.put("thread-1", {"step": 1})
+        saver.put("thread-2", {"step": 2})
+        assert not path.exists()
+
+        saver.flush()
+        with closing(DiskBackedMemorySaver(persist_path=str(path))) as reloaded:
+            assert "thread-1" in reloaded
+
+        saver.delete("thread-1")
+        with saver:
+            pass
+        with closing(DiskBackedMemorySaver(persist_path=str(path))) as reloaded:
+            assert "thread-1" not in reloaded
+        saver.close()
+
+    def test_writes_encode_only_changed_threads(self, tmp_path, monkeypatch):
+        """Test that a write reuses the bytes of unchanged checkpoints"""
+        encoded = []
+        dumps = DiskBackedMemorySaver._dumps_checkpoint
+
+        def counting_dumps(checkpoint):
+            encoded.append(checkpoint["step"])
+            return dumps(checkpoint)
+
+        monkeypatch.setattr(
+            DiskBackedMemorySaver, "_dumps_checkpoint", staticmethod(counting_dumps)
+        )
+        path = str(tmp_path / "checkpoints.bin")
+        saver = DiskBackedMemorySaver(persist_path=path)
+        for step in range(3):
+            saver.put(f"thread-{step}", {"step": step})
+        saver.flush()
+        assert sorted(encoded) == [0, 1, 2]
+
+        saver.put("thread-1", {"step": 10})
+        saver.delete("thread-2")
+        saver.flush()
+        assert sorted(encoded) == [0, 1, 2, 10]
+
+        reloaded = DiskBackedMemorySaver(persist_path=path)
+        assert reloaded.get("thread-0") == {"step": 0}
+        assert reloaded.get("thread-1") == {"step": 10}
+        assert "thread-2" not in reloaded
+        reloaded.close()
+
+        saver.clear_all()
+        saver.close()
+        with closing(DiskBackedMemorySaver(persist_path=path)) as reloaded:
+            assert len(reloaded) == 0
+
+    def test_flush_reports_write_errors(self, tmp_path):
+        """Test that a checkpoint that fails to encode does not block others"""
+        path = str(tmp_path / "checkpoints.bin")
+        saver = DiskBackedMemorySaver(persist_path=path)
+        saver.put("thread-1", {"value": threading.Lock()})
+        saver.put("thread-2", {"step": 2})
+        with pytest.raises(TypeError):
+            saver.flush()
+
+        with closing(DiskBackedMemorySaver(persist_path=path)) as reloaded:
+            assert "thread-1" not in reloaded
+            assert reloaded.get("thread-2") == {"step": 2}
+
+        saver.put("thread-2", {"step": 3})
+        saver.close()
+        with closing(DiskBackedMemorySaver(persist_path=path)) as reloaded:
+            assert reloaded.get("thread-2") == {"step": 3}
+
+    def test_encoding_is_not_cached_across_puts(self, tmp_path, monkeypatch):
+        """Test that a put during encoding discards the stale encoding"""
+        path = str(tmp_path / "checkpoints.bin")
+        saver = DiskBackedMemorySaver(persist_path=path)
+        dumps = DiskBackedMemorySaver._dumps_checkpoint
+
+        def racing_dumps(checkpoint):
+            buf = dumps(checkpoint)
+            if checkpoint == {"v": "A"}:
+                saver.put("thread-1", {"v": "B"})
+            return buf
+
+        monkeypatch.setattr(
+            DiskBackedMemorySaver, "_dumps_checkpoint", staticmethod(racing_dumps)
+        )
+        saver.put("thread-1", {"v": "A"})
+        saver.get_metadata("thread-1")
+        saver.close()
+
+        with closing(DiskBackedMemorySaver(persist_path=path)) as reloaded:
+            assert reloaded.get("thread-1") == {"v": "B"}
+
+    def test_loads_legacy_json_file(self, tmp_path):
+        """Test that JSON files written by earlier versions still load"""
+        path = tmp_path / "checkpoints.json"
+        path.write_bytes(
+            b'{"checkpoints": {"thread-1": {"step": 1}},'
+            b' "metadata": {"thread-1": {"timestamp": 1.0, "size": 11}}}'
+        )
+
+        saver = DiskBackedMemorySaver(persist_path=str(path))
+        assert saver.get("thread-1") == {"step": 1}
+        assert saver.get_metadata("thread-1")["timestamp"] == 1.0
+
+        saver.put("thread-2", {"step": 2})
+        saver.close()
+        assert path.read_bytes().startswith(b"LGSV")
+
+        reloaded = DiskBackedMemorySaver(persist_path=str(path))
+        assert reloaded.get("thread-1") == {"step": 1}
+        assert reloaded.get("thread-2") == {"step": 2}
+        reloaded.close()
+
+    def test_round_trips_non_json_values(self, tmp_path):
+        """Test that values JSON cannot represent survive a reload"""
+        path = str(tmp_path / "checkpoints.bin")
+        checkpoint = {"blob": b"\x00\x01", "pair": (1, 2), 3: {"nested"}}
+        saver = DiskBackedMemorySaver(persist_path=path)
+        saver.put("thread-1", checkpoint)
+        saver.close()
+
+        reloaded = DiskBackedMemorySaver(persist_path=path)
+        assert reloaded.get("thread-1") == checkpoint
+        reloaded.close()
+
+    def test_torn_file_is_not_discarded(self, tmp_path):
+        """Test that a damaged pickle file raises instead of loading empty"""
+        path = tmp_path / "checkpoints.bin"
+        saver = DiskBackedMemorySaver(persist_path=str(path))
+        for step in range(50):
+            saver.put(f"thread-{step}", {"step": step})
+        saver.close()
+        assert not (tmp_path / "checkpoints.bin.tmp").exists()
+
+        torn = path.read_bytes()[: path.stat().st_size // 2]
+        path.write_bytes(torn)
+        with pytest.raises(ValueError):
+            DiskBackedMemorySaver(persist_path=str(path))
+        assert path.read_bytes() == torn
+
+    def test_invalid_file_starts_empty(self, tmp_path):
+        """Test that an unreadable file is ignored"""
+        path = tmp_path / "checkpoints.json"
+        path.write_bytes(b"not json")
+
+        saver = DiskBackedMemorySaver(persist_path=str(path))
+        assert len(saver) == 0
+        saver.close()
+
+    def test_writes_after_close_raise(self, tmp_path):
+        """Test that a closed saver refuses writes it could not persist"""
+        path = str(tmp_path / "checkpoints.bin")
+        saver = DiskBackedMemorySaver(persist_path=path)
+        saver.put("a", {"step": 1})
+        saver.close()
+
+        with pytest.raises(ValueError):
+            saver.put("b", {"step": 2})
+        with pytest.raises(ValueError):
+            saver.delete("a")
+        with pytest.raises(ValueError):
+            saver.clear_all()
+        assert "b" not in saver
+        saver.flush()
+        saver.close()
+
+        with closing(DiskBackedMemorySaver(persist_path=path)) as reloaded:
+            assert reloaded.get("a") == {"step": 1}
+
+    def test_dropped_saver_is_collected(self, tmp_path):
+        """Test that an unclosed saver writes its changes and releases its thread"""
+        path = str(tmp_path / "checkpoints.bin")
+        saver = DiskBackedMemorySaver(persist_path=path)
+        saver.put("thread-1", {"step": 1})
+        flusher = saver._flusher  # pylint: disable=protected-access
+        saver_ref = weakref.ref(saver)
+        del saver
+
+        flusher.join(timeout=5)
+        gc.collect()
+        assert not flusher.is_alive()
+        assert saver_ref() is None
+        with closing(DiskBackedMemorySaver(persist_path=path)) as reloaded:
+            assert reloaded.get("thread-1") == {"step": 1}
+
+
+class TestAsyncDiskBackedMemorySaver:
+    """Test the async disk-backed memory saver"""
+
+    async def test_async_operations_persist(self, tmp_path):
+        """Test that async writes reach disk without blocking the loop"""
+        path = str(tmp_path / "checkpoints.bin")
+        saver = AsyncDiskBackedMemorySaver(persist_path=path)
+
+        await saver.aput("thread-1", {"step": 1})
+        await saver.aput("thread-2", {"step": 2})
+        await saver.adelete("thread-2")
+        assert await saver.aget("thread-1") == {"step": 1}
+        assert await saver.alist_threads() == ["thread-1"]
+        await saver.aflush()
+
+        reloaded = DiskBackedMemorySaver(persist_path=path)
+        assert reloaded.get("thread-1") == {"step": 1}
+        assert "thread-2" not in reloaded
+        reloaded.close()
+
+        await saver.aclear_all()
+        await saver.aclose()
+        with closing(DiskBackedMemorySaver(persist_path=path)) as reloaded:
+            assert len(reloaded) == 0
+
+
 class TestCheckpointerIntegration:
     """Integration tests for checkpointer functionality"""
 
@@ -70,6 +384,19 @@ class TestCheckpointerIntegration:
         async_saver = AsyncMemorySaver()
         assert async_saver is not None
 
+    def test_instances_have_no_dict(self):
+        """Test that savers and contexts use __slots__ and stay weak-referenceable"""
+        saver = MemorySaver()
+        for instance in (
+            saver,
+            DiskBackedMemorySaver(),
+            AsyncMemorySaver(),
+            AsyncDiskBackedMemorySaver(),
+            CheckpointContext(saver, "test_thread"),
+        ):
+            assert not hasattr(instance, "__dict__")
+            assert weakref.ref(instance)() is instance
+
     def test_checkpoint_context(self):
         """Test checkpoint context functionality"""
         # Test that we can create a checkpoint context
@@ -2,10 +2,14 @@
 Tests for the store module
 """
 
+import weakref
+
 import pytest
 
+from langgraph_runtime_inmem_open import _json
 from langgraph_runtime_inmem_open.store import (
     BaseStore,
+    DiskBackedInMemStore,
     InMemoryStore,
 )
 
@@ -106,6 +110,42 @@ class TestInMemoryStore:
         # Should not raise an exception
         self.store.delete(namespace, "nonexistent")
 
+    def test_ttl_expiry(self):
+        """Test that expired items are dropped on the next read"""
+        namespace = ("test", "namespace")
+        self.store.put(namespace, "expired", {"data": "value1"}, ttl=0)
+        self.store.put(namespace, "live", {"data": "value2"}, ttl=5)
+
+        assert self.store.get(namespace, "expired") is None
+        assert self.store.search(namespace) == [{"data": "value2"}]
+        data = self.store._data  # pylint: disable=protected-access
+        assert (namespace, "expired") not in data
+
+    def test_ttl_replaced_by_later_put(self):
+        """Test that a later put overrides an earlier expiry time"""
+        namespace = ("test", "namespace")
+        self.store.put(namespace, "key1", {"data": "old"}, ttl=0)
+        self.store.put(namespace, "key1", {"data": "new"}, ttl=5)
+        self.store.put(namespace, "key2", {"data": "old"}, ttl=0)
+        self.store.put(namespace, "key2", {"data": "new"})
+
+        assert self.store.get(namespace, "key1") == {"data": "new"}
+        assert self.store.get(namespace, "key2") == {"data": "new"}
+        ttl_heap = self.store._ttl_heap  # pylint: disable=protected-access
+        assert [entry[2] for entry in ttl_heap] == ["key1"]
+
+    def test_ttl_heap_stays_bounded(self):
+        """Test that re-putting a key does not grow the expiry heap"""
+        namespace = ("test", "namespace")
+        for i in range(100):
+            self.store.put(namespace, "key1", {"data": i}, ttl=60)
+        self.store.put(namespace, "key2", {"data": "other"}, ttl=30)
+
+        ttl_heap = self.store._ttl_heap  # pylint: disable=protected-access
+        assert len(ttl_heap) <= 4
+        assert min(ttl_heap)[2] == "key2"
+        assert self.store.get(namespace, "key1") == {"data": 99}
+
     def test_search(self):
         """Test searching for items"""
         namespace = ("test", "namespace")
@@ -123,6 +163,114 @@ class TestInMemoryStore:
         assert len(results) == 1
         assert results[0]["data"] == "value1"
 
+    def test_search_multi_key_filter(self):
+        """Test filters on several fields, including missing fields"""
+        namespace = ("test", "namespace")
+        self.store.put(namespace, "key1", {"type": "a", "size": 1})
+        self.store.put(namespace, "key2", {"type": "a", "size": 2})
+        self.store.put(namespace, "key3", {"type": "b"})
+
+        results = self.store.search(namespace, filter={"type": "a", "size": 2})
+        assert results == [{"type": "a", "size": 2}]
+
+        assert not self.store.search(namespace, filter={"type": "b", "size": None})
+        assert not self.store.search(namespace, filter={"missing": None})
+        assert len(self.store.search(namespace, filter={})) == 3
+
+    def test_search_filter_shapes(self):
+        """Test filters with unhashable values, odd key names and non-str keys"""
+        namespace = ("test", "namespace")
+        self.store.put(namespace, "key1", {"tags": ["a", "b"], "it's": 1, 2: "two"})
+        self.store.put(namespace, "key2", {"tags": ["c"], "it's": 1})
+
+        results = self.store.search(namespace, filter={"tags": ["a", "b"], "it's": 1})
+        assert [r["tags"] for r in results] == [["a", "b"]]
+        results = self.store.search(namespace, filter={"it's": 1, "tags": ["c"]})
+        assert [r["tags"] for r in results] == [["c"]]
+        assert len(self.store.search(namespace, filter={2: "two"})) == 1
+
+    def test_search_pagination(self):
+        """Test offset and limit across several namespaces"""
+        for i in range(5):
+            self.store.put(("docs", str(i % 2)), f"key{i}", {"index": i})
+
+        results = self.store.search(("docs",), limit=100)
+        assert sorted(r["index"] for r in results) == [0, 1, 2, 3, 4]
+
+        page = self.store.search(("docs",), limit=2, offset=1)
+        assert page == results[1:3]
+        assert not self.store.search(("docs",), offset=5)
+
+    def test_negative_offset_and_limit_are_clamped(self):
+        """Test that negative offsets and limits are treated as zero"""
+        for i in range(3):
+            self.store.put(("docs",), f"key{i}", {"index": i})
+
+        results = self.store.search(("docs",))
+        assert self.store.search(("docs",), offset=-1) == results
+        assert not self.store.search(("docs",), limit=-1)
+        assert self.store.list_namespaces(offset=-1) == [("docs",)]
+        assert not self.store.list_namespaces(limit=-1)
+
+    def test_search_tolerates_writes_during_iteration(self):
+        """Test that writes during a search copy the bucket being read"""
+        store = self.store
+        namespace = ("docs",)
+
+        class WritingItem(dict):
+            """Item that writes to the store when the filter inspects it"""
+
+            def get(self, key, default=None):
+                store.put(namespace, f"new{len(self)}", {"type": "new"})
+                store.delete(namespace, "b")
+                return super().get(key, default)
+
+        store.put(namespace, "a", WritingItem(type="doc"))
+        store.put(namespace, "b", {"type": "doc"})
+
+        results = store.search(namespace, filter={"type": "doc"})
+        # The search sees the items as they were when it reached the bucket
+        assert len(results) == 2
+        assert store.get(namespace, "b") is None
+        assert store.get(namespace, "new1") == {"type": "new"}
+
+    def test_finished_search_releases_bucket(self):
+        """Test that writes after a search do not copy the bucket"""
+        namespace = ("docs",)
+        for i in range(5):
+            self.store.put(namespace, f"key{i}", {"index": i})
+        buckets = self.store._by_ns  # pylint: disable=protected-access
+        bucket = buckets[namespace]
+
+        assert len(self.store.search(namespace, limit=1)) == 1
+        self.store.put(namespace, "key5", {"index": 5})
+        assert buckets[namespace] is bucket
+        assert not self.store._readers  # pylint: disable=protected-access
+
+    def test_namespace_components_may_contain_separator(self):
+        """Test that items are keyed by namespace tuple, not a joined string"""
+        self.store.put(("a:b",), "c", {"data": "value1"})
+        self.store.put(("a",), "b:c", {"data": "value2"})
+
+        assert self.store.get(("a:b",), "c") == {"data": "value1"}
+        assert self.store.get(("a",), "b:c") == {"data": "value2"}
+
+    def test_search_namespace_prefix(self):
+        """Test that search matches whole namespace components"""
+        self.store.put(("users", "123"), "key1", {"data": "value1"})
+        self.store.put(("users", "123", "prefs"), "key1", {"data": "value2"})
+        self.store.put(("users", "1234"), "key1", {"data": "value3"})
+        self.store.put(("users:123",), "key1", {"data": "value4"})
+
+        results = self.store.search(("users", "123"))
+        assert sorted(r["data"] for r in results) == ["value1", "value2"]
+
+        self.store.delete(("users", "123"), "key1")
+        results = self.store.search(("users", "123"))
+        assert [r["data"] for r in results] == ["value2"]
+
+        assert len(self.store.search(())) == 3
+
     def test_list_namespaces(self):
         """Test listing namespaces"""
         # Add data to different namespaces
@@ -134,6 +282,200 @@ class TestInMemoryStore:
         assert ("ns1",) in namespaces
         assert ("ns2",) in namespaces
 
+    def test_list_namespaces_filters(self):
+        """Test prefix, suffix and depth filters on namespaces"""
+        for namespace in [
+            ("users", "123"),
+            ("users", "123", "prefs"),
+            ("users", "456", "prefs"),
+            ("teams", "prefs"),
+            ("users",),
+        ]:
+            self.store.put(namespace, "key1", {"data": "value"})
+
+        assert sorted(self.store.list_namespaces(prefix=("users",))) == [
+            ("users",),
+            ("users", "123"),
+            ("users", "123", "prefs"),
+            ("users", "456", "prefs"),
+        ]
+        assert sorted(self.store.list_namespaces(suffix=("prefs",))) == [
+            ("teams", "prefs"),
+            ("users", "123", "prefs"),
+            ("users", "456", "prefs"),
+        ]
+        assert (
+            self.store.list_namespaces(
+                prefix=("users",), suffix=("prefs",), max_depth=2
+            )
+            == []
+        )
+        assert sorted(self.store.list_namespaces(prefix=("users",), max_depth=2)) == [
+            ("users",),
+            ("users", "123"),
+        ]
+        assert self.store.list_namespaces(prefix=("users", "123"), max_depth=1) == []
+        assert self.store.list_namespaces(suffix=("123", "prefs")) == [
+            ("users", "123", "prefs")
+        ]
+        assert self.store.list_namespaces(suffix=("users",)) == [("users",)]
+        assert self.store.list_namespaces(prefix=("missing",)) == []
+        assert len(self.store.list_namespaces(limit=2)) == 2
+        assert len(self.store.list_namespaces(offset=4)) == 1
+
+
+class TestDiskBackedInMemStore:
+    """Test the disk-backed store"""
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test that data is reloaded from disk"""
+        path = str(tmp_path / "store.json")
+        store = DiskBackedInMemStore(persist_path=path)
+        store.put(("user", "123"), "key1", {"data": "value1"})
+        store.put(("user", "456"), "key1", {"data": "value2"})
+        store.delete(("user", "456"), "key1")
+        store.close()
+
+        reloaded = DiskBackedInMemStore(persist_path=path)
+        assert reloaded.get(("user", "123"), "key1") == {"data": "value1"}
+        assert reloaded.get(("user", "456"), "key1") is None
+        assert ("user", "123") in reloaded.list_namespaces()
+        reloaded.close()
+
+    def test_log_compaction(self, tmp_path):
+        """Test that the log is folded into the snapshot once it grows"""
+        path = tmp_path / "store.json"
+        log_path = tmp_path / "store.json.log"
+        store = DiskBackedInMemStore(persist_path=str(path), compact_threshold=3)
+
+        store.put(("ns",), "key1", {"data": "value1"})
+        store.put(("ns",), "key2", {"data": "value2"})
+        assert not path.exists()
+        assert len(log_path.read_bytes().splitlines()) == 2
+
+        store.put(("ns",), "key3", {"data": "value3"}, ttl=5)
+        assert path.exists()
+        assert log_path.read_bytes() == b""
+
+        store.delete(("ns",), "key1")
+        store.close()
+
+        reloaded = DiskBackedInMemStore(persist_path=str(path))
+        assert reloaded.get(("ns",), "key1") is None
+        assert reloaded.get(("ns",), "key3") == {"data": "value3"}
+        assert reloaded._ttl_data  # pylint: disable=protected-access
+        reloaded.close()
+
+    def test_snapshot_formatting(self, tmp_path):
+        """Test that snapshots are compact unless pretty output is requested"""
+        for pretty in (False, True):
+            path = tmp_path / f"store-{pretty}.json"
+            store = DiskBackedInMemStore(persist_path=str(path), pretty=pretty)
+            store.put(("ns",), "key1", {"data": "value1"})
+            store.compact()
+            store.close()
+            assert (b"\n" in path.read_bytes()) is pretty
+
+            reloaded = DiskBackedInMemStore(persist_path=str(path))
+            assert reloaded.get(("ns",), "key1") == {"data": "value1"}
+            reloaded.close()
+
+    def test_snapshot_without_orjson(self, tmp_path, monkeypatch):
+        """Test that the stdlib json fallback writes the same compact snapshot"""
+        path = tmp_path / "store.json"
+        store = DiskBackedInMemStore(persist_path=str(path))
+        store.put(("ns",), "key1", {"data": "café"})
+        store.compact()
+        expected = path.read_bytes()
+
+        monkeypatch.setattr(_json, "orjson", None)
+        store.compact()
+        store.close()
+        assert path.read_bytes() == expected
+
+    def test_loads_legacy_snapshot(self, tmp_path):
+        """Test that snapshots keyed by joined namespace strings still load"""
+        path = tmp_path / "store.json"
+        path.write_bytes(
+            b'{"data": {"user:123:key1": {"data": "value1"}, "user:key2": {"data": 2}},'
+            b' "namespaces": [["user", "123"], ["user"]],'
+            b' "ttl_data": {"user:key2": 9999999999.0}}'
+        )
+
+        store = DiskBackedInMemStore(persist_path=str(path))
+        assert store.get(("user", "123"), "key1") == {"data": "value1"}
+        assert store.get(("user",), "key2") == {"data": 2}
+        assert len(store.search(("user",))) == 2
+        store.close()
+
+    def test_writes_after_close_raise(self, tmp_path):
+        """Test that a closed store refuses writes it could not persist"""
+        path = str(tmp_path / "store.json")
+        store = DiskBackedInMemStore(persist_path=path)
+        store.put(("ns",), "key1", {"data": "value1"})
+        store.close()
+
+        with pytest.raises(ValueError):
+            store.put(("ns",), "key2", {"data": "value2"})
+        with pytest.raises(ValueError):
+            store.delete(("ns",), "key1")
+        with pytest.raises(ValueError):
+            store.compact()
+        assert store.get(("ns",), "key2") is None
+        assert store.get(("ns",), "key1") == {"data": "value1"}
+
+        # Stores without a persistence file have nothing to close
+        memory_only = DiskBackedInMemStore()
+        memory_only.close()
+        memory_only.put(("ns",), "key1", {"data": "value1"})
+
+    def test_damaged_snapshot_is_not_discarded(self, tmp_path):
+        """Test that an unreadable snapshot raises instead of loading empty"""
+        path = tmp_path / "store.json"
+        store = DiskBackedInMemStore(persist_path=str(path))
+        store.put(("ns",), "key1", {"data": "value1"})
+        store.compact()
+        store.close()
+
+        damaged = path.read_bytes()[:10]
+        path.write_bytes(damaged)
+        with pytest.raises(ValueError):
+            DiskBackedInMemStore(persist_path=str(path))
+        assert path.read_bytes() == damaged
+
+    def test_torn_log_tail_is_ignored(self, tmp_path):
+        """Test that a partially written last record is skipped on load"""
+        path = tmp_path / "store.json"
+        store = DiskBackedInMemStore(persist_path=str(path))
+        store.put(("ns",), "key1", {"data": "value1"})
+        store.close()
+        with open(f"{path}.log", "ab") as f:
+            f.write(b'{"op": "put", "ns"')
+
+        reloaded = DiskBackedInMemStore(persist_path=str(path))
+        assert reloaded.get(("ns",), "key1") == {"data": "value1"}
+        reloaded.close()
+
+    def test_appends_after_torn_log_tail(self, tmp_path):
+        """Test that records written after a torn tail survive a reload"""
+        path = tmp_path / "store.json"
+        store = DiskBackedInMemStore(persist_path=str(path))
+        store.put(("ns",), "key1", {"data": "value1"})
+        store.close()
+        with open(f"{path}.log", "ab") as f:
+            f.write(b'{"op": "put", "ns"')
+
+        store = DiskBackedInMemStore(persist_path=str(path))
+        store.put(("ns",), "key2", {"data": "value2"})
+        store.put(("ns",), "key3", {"data": "value3"})
+        store.close()
+
+        reloaded = DiskBackedInMemStore(persist_path=str(path))
+        assert reloaded.get(("ns",), "key1") == {"data": "value1"}
+        assert reloaded.get(("ns",), "key2") == {"data": "value2"}
+        assert reloaded.get(("ns",), "key3") == {"data": "value3"}
+        reloaded.close()
+
 
 class TestStoreIntegration:
     """Integration tests for store functionality"""
@@ -146,6 +488,12 @@ class TestStoreIntegration:
         for method in required_methods:
             assert hasattr(store, method)
 
+    def test_instances_have_no_dict(self):
+        """Test that stores use __slots__ and stay weak-referenceable"""
+        for store in (InMemoryStore(), DiskBackedInMemStore()):
+            assert not hasattr(store, "__dict__")
+            assert weakref.ref(store)() is store
+
     def test_namespace_operations(self):
         """Test namespace-based operations"""
         store = InMemoryStore()